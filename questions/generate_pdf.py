@@ -7,14 +7,18 @@ Open-CS-408 习题册PDF生成工具
 - 使用 NotoSansSC-Regular.ttf
 - 输出文件：Open-CS-408习题册.pdf
 """
+import os
 import sqlite3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from datetime import datetime
-from itertools import groupby
 
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image as PlatypusImage
+    SimpleDocTemplate, Paragraph, Spacer, PageBreak, Flowable,
+    Image as PlatypusImage
 )
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import inch
@@ -27,6 +31,9 @@ DB_PATH = "questions.db"
 OUTPUT_PDF = "Open-CS-408习题册.pdf"
 FONT_PATH = "fonts/NotoSansSC-Regular.ttf"
 
+# 封面生成时间，进程启动时取一次即可
+TODAY_STR = datetime.now().strftime("%Y年%m月%d日")
+
 # 科目与章节
 SUBJECTS = {
     "DS": {"name": "数据结构", "chapters": {"01": "基本概念", "02": "线性表", "03": "栈、队列和数组", "04": "树与二叉树", "05": "图", "06": "查找", "07": "排序"}},
@@ -38,11 +45,11 @@ QUESTION_TYPES = {"single_choice": "单选题", "application": "应用题"}
 
 SUBJECT_ORDER = list(SUBJECTS.keys())  # ['DS', 'CO', 'OS', 'CN']
 
-CHAPTER_ORDER_MAP = {
-    subject_code: {ch_num: idx for idx,
-                   ch_num in enumerate(info["chapters"].keys())}
-    for subject_code, info in SUBJECTS.items()
-}
+# 将SUBJECTS定义的科目顺序编码为CASE表达式，让SQLite在C层完成排序；
+# 章节号本身是"01"、"02"……，字典序即定义顺序，直接按列排序即可
+_SUBJECT_ORDER_SQL = "CASE subject_code " + " ".join(
+    f"WHEN '{code}' THEN {idx}" for idx, code in enumerate(SUBJECT_ORDER)
+) + " ELSE 999 END"
 
 # === 注册中文字体 ===
 
@@ -59,127 +66,230 @@ CHINESE_FONT = register_chinese_font()
 
 # === 工具函数 ===
 
+# 换行转<br/>用C实现的translate完成，避免每题一次replace的中间拷贝
+_BR_TRANS = str.maketrans({"\n": "<br/>"})
+_OPT_PREFIXES = ("A. ", "B. ", "C. ", "D. ")
 
-def safe_image(image_path, max_width=5*inch):
-    if not image_path or not Path(image_path).exists():
-        return None
+
+def _decode_image(path):
+    """在子进程中解码一张图片，返回(编码后字节, 原始宽, 原始高)，失败返回None
+
+    图片解码是CPU密集操作且相互独立，放进进程池可以在多核上并行。
+    """
+    from PIL import Image
+    # 版面上图片最宽5英寸，按150DPI嵌入已足够清晰
+    target_px = 5 * 150
     try:
-        img = PlatypusImage(image_path, width=max_width)
-        img.hAlign = 'CENTER'
-        return img
+        with Image.open(path) as img:
+            img.load()
+            # 超过目标分辨率的图先缩小再嵌入，避免多兆像素原图原样进PDF
+            if img.width > target_px:
+                img.thumbnail((target_px, target_px * 10), Image.LANCZOS)
+            buf = BytesIO()
+            # 带透明通道/调色板的图（多为示意线条图）保持PNG，照片类转JPEG
+            if img.mode in ("P", "1", "RGBA", "LA"):
+                img.save(buf, format="PNG", optimize=True)
+            else:
+                if img.mode != "RGB":
+                    img = img.convert("RGB")
+                img.save(buf, format="JPEG", quality=85)
+            return buf.getvalue(), img.width, img.height
     except Exception:
         return None
 
+
+def preprocess_images(questions):
+    """并行预解码全部题图，返回 {路径: (字节, 宽, 高)}"""
+    unique_paths = sorted(
+        p for p in {q.image_path for q in questions if q.image_path}
+        if os.path.isfile(p)
+    )
+    if not unique_paths:
+        return {}
+    with ProcessPoolExecutor() as pool:
+        results = pool.map(_decode_image, unique_paths)
+    return {path: decoded
+            for path, decoded in zip(unique_paths, results)
+            if decoded is not None}
+
+
+def safe_image(image_path, images, max_width=5*inch):
+    if not image_path:
+        return None
+    cached = images.get(image_path)
+    if cached is None:
+        return None
+    data, natural_w, natural_h = cached
+    # 尺寸在预解码时已算好，按原始宽高比显式传入，ReportLab不再读文件
+    img = PlatypusImage(BytesIO(data), width=max_width,
+                        height=max_width * natural_h / natural_w)
+    img.hAlign = 'CENTER'
+    return img
+
 # === 1. 读取已发布题目 ===
 
+# 只取PDF实际用到的列；namedtuple比dict/Row更省内存，属性访问也更快
+Question = namedtuple("Question", [
+    "id", "subject_code", "chapter_num", "question_type", "question_text",
+    "option_a", "option_b", "option_c", "option_d",
+    "correct_answer", "explanation", "image_path",
+])
 
-def fetch_published_questions():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+
+def connect_readonly():
+    """以只读URI打开题库，并为一次性全表扫描调优页缓存与内存映射
+
+    只用mode=ro不加immutable：题库是WAL模式，immutable会跳过-wal文件，
+    读不到已提交未检查点的数据（漏题甚至看不到表）。
+    连接由main持有，生成过程中的所有读取共享同一份已预热的页缓存。
+    """
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    cur = conn.cursor()
+    cur.execute("PRAGMA query_only=1")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-65536")      # 64MB页缓存
+    cur.execute("PRAGMA mmap_size=268435456")    # 256MB内存映射，减少read系统调用
+    return conn
+
+
+def fetch_published_questions(conn):
     cur = conn.cursor()
-    cur.execute("""
-        SELECT * FROM questions
+    cur.execute(f"""
+        SELECT {", ".join(Question._fields)} FROM questions
         WHERE status = 'published'
-        ORDER BY id  -- 仅保证确定性，主排序在Python中做
+        ORDER BY {_SUBJECT_ORDER_SQL}, chapter_num, id
     """)
-    questions = [dict(row) for row in cur.fetchall()]
-    conn.close()
+    return list(map(Question._make, cur))
+
+
+def group_questions(questions):
+    """把已排序的题目整理成 [(科目, [(章节, [题目,...]), ...]), ...] 嵌套结构
+
+    题目已按科目/章节排好序，单次线性遍历盯着边界即可，
+    不需要groupby的键函数调用，也没有子迭代器的中间列表。
+    """
+    grouped = []
+    chapters = chapter_questions = None
+    prev_subject = prev_chapter = None
+    for q in questions:
+        if q.subject_code != prev_subject:
+            chapters = []
+            grouped.append((q.subject_code, chapters))
+            prev_subject = q.subject_code
+            prev_chapter = None
+        if q.chapter_num != prev_chapter:
+            chapter_questions = []
+            chapters.append((q.chapter_num, chapter_questions))
+            prev_chapter = q.chapter_num
+        chapter_questions.append(q)
+    return grouped
 
-    # 按照 SUBJECTS 中定义的顺序排序
-    def sort_key(q):
-        sub = q["subject_code"]
-        chap = q["chapter_num"]
-        sub_idx = SUBJECT_ORDER.index(sub) if sub in SUBJECT_ORDER else 999
-        chap_idx = CHAPTER_ORDER_MAP[sub].get(
-            chap, 999) if sub in CHAPTER_ORDER_MAP else 999
-        return (sub_idx, chap_idx, q["id"])
+# === 2. 生成PDF内容 ===
 
-    questions.sort(key=sort_key)
-    return questions
 
-# === 2. 生成PDF内容 ===
+class OutlineEntry(Flowable):
+    """零尺寸流对象：排版到哪一页，书签就落在哪一页
 
+    直接用ReportLab画布的大纲接口，省去事后用pypdf重写整个PDF的那一遍。
+    """
 
-def generate_content_pdf(questions, output_path):
-    doc = SimpleDocTemplate(output_path, pagesize=A4, leftMargin=72,
-                            rightMargin=72, topMargin=72, bottomMargin=72)
+    def __init__(self, title, key, level):
+        super().__init__()
+        self.title = title
+        self.key = key
+        self.level = level
+        self.width = 0
+        self.height = 0
 
-    # 样式定义
-    normal_style = ParagraphStyle(
-        'Normal', fontName=CHINESE_FONT, fontSize=11, leading=14, spaceAfter=6)
-
-    subject_title_style = ParagraphStyle(
-        'SubjectTitle',
-        fontName=CHINESE_FONT,
-        fontSize=20,
-        leading=24,
-        alignment=TA_CENTER,
-        spaceBefore=18,
-        spaceAfter=12
-    )
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=self.level)
 
-    chapter_title_style = ParagraphStyle(
-        'ChapterTitle',
-        fontName=CHINESE_FONT,
-        fontSize=16,
-        leading=18,
-        spaceBefore=12,
-        spaceAfter=8
-    )
 
-    cover_title_style = ParagraphStyle(
-        'CoverTitle',
-        fontName=CHINESE_FONT,
-        fontSize=28,
-        alignment=TA_CENTER,
-        spaceAfter=30
-    )
+# 样式定义：样式对象不可变，模块级构建一次，所有Paragraph共享
+NORMAL_STYLE = ParagraphStyle(
+    'Normal', fontName=CHINESE_FONT, fontSize=11, leading=14, spaceAfter=6)
+
+SUBJECT_TITLE_STYLE = ParagraphStyle(
+    'SubjectTitle',
+    fontName=CHINESE_FONT,
+    fontSize=20,
+    leading=24,
+    alignment=TA_CENTER,
+    spaceBefore=18,
+    spaceAfter=12
+)
+
+CHAPTER_TITLE_STYLE = ParagraphStyle(
+    'ChapterTitle',
+    fontName=CHINESE_FONT,
+    fontSize=16,
+    leading=18,
+    spaceBefore=12,
+    spaceAfter=8
+)
+
+COVER_TITLE_STYLE = ParagraphStyle(
+    'CoverTitle',
+    fontName=CHINESE_FONT,
+    fontSize=28,
+    alignment=TA_CENTER,
+    spaceAfter=30
+)
+
+
+def generate_content_pdf(questions, grouped, images, output_path):
+    doc = SimpleDocTemplate(output_path, pagesize=A4, leftMargin=72,
+                            rightMargin=72, topMargin=72, bottomMargin=72)
 
     story = []
 
     # 封面
     story.append(Spacer(1, 1.5 * inch))
-    story.append(Paragraph("Open-CS-408", cover_title_style))
-    story.append(Paragraph("习题册", cover_title_style))
+    story.append(Paragraph("Open-CS-408", COVER_TITLE_STYLE))
+    story.append(Paragraph("习题册", COVER_TITLE_STYLE))
     story.append(Spacer(1, 0.5 * inch))
-    story.append(
-        Paragraph(f"生成时间：{datetime.now().strftime('%Y年%m月%d日')}", normal_style))
+    story.append(Paragraph(f"生成时间：{TODAY_STR}", NORMAL_STYLE))
     story.append(PageBreak())
 
     # 第一部分：习题
-    story.append(Paragraph("习题", chapter_title_style))
+    story.append(OutlineEntry("习题", "part-questions", 0))
+    story.append(Paragraph("习题", CHAPTER_TITLE_STYLE))
     story.append(Spacer(1, 12))
 
     question_index = 1
 
-    # 按科目分组
-    for subject_code, subject_group_iter in groupby(questions, key=lambda x: x["subject_code"]):
-        subject_group = list(subject_group_iter)  # 转为列表以便遍历
+    # 按科目/章节遍历预先分好组的结构
+    for subject_code, chapters in grouped:
         subject_name = SUBJECTS[subject_code]["name"]
-        story.append(Paragraph(subject_name, subject_title_style))
+        story.append(OutlineEntry(subject_name, f"subj-{subject_code}", 1))
+        story.append(Paragraph(subject_name, SUBJECT_TITLE_STYLE))
 
-        # 按章节分组
-        for chapter_num, chapter_group in groupby(subject_group, key=lambda x: x["chapter_num"]):
+        for chapter_num, chapter_questions in chapters:
             chapter_name = SUBJECTS[subject_code]["chapters"][chapter_num]
-            story.append(Paragraph(chapter_name, chapter_title_style))
-
-            for q in chapter_group:
-                story.append(Paragraph(
-                    f"{question_index}. {q['question_text'].replace('\n', '<br/>')}", normal_style))
-
-                if q["question_type"] == "single_choice":
-                    for opt in "ABCD":
-                        val = q.get(f"option_{opt.lower()}")
+            story.append(OutlineEntry(
+                chapter_name, f"chap-{subject_code}{chapter_num}", 2))
+            story.append(Paragraph(chapter_name, CHAPTER_TITLE_STYLE))
+
+            for q in chapter_questions:
+                # 每题的流对象先收集到局部列表，最后一次extend进story
+                flowables = [Paragraph(
+                    f"{question_index}. {q.question_text.translate(_BR_TRANS)}", NORMAL_STYLE)]
+
+                if q.question_type == "single_choice":
+                    options = (q.option_a, q.option_b, q.option_c, q.option_d)
+                    for prefix, val in zip(_OPT_PREFIXES, options):
                         if val:
-                            story.append(
-                                Paragraph(f"{opt}. {val}", normal_style))
+                            flowables.append(
+                                Paragraph(prefix + val, NORMAL_STYLE))
 
-                img = safe_image(q.get("image_path"))
+                img = safe_image(q.image_path, images)
                 if img:
-                    story.append(Spacer(1, 6))
-                    story.append(img)
+                    flowables.append(Spacer(1, 6))
+                    flowables.append(img)
 
-                story.append(Spacer(1, 12))
+                flowables.append(Spacer(1, 12))
+                story.extend(flowables)
                 question_index += 1
 
         # 每个科目结束后换页（但最后一个科目不需要额外换页）
@@ -187,62 +297,29 @@ def generate_content_pdf(questions, output_path):
         story.append(PageBreak())
 
     # 第二部分：答案与解析
-    story.append(Paragraph("答案解析", chapter_title_style))
+    story.append(OutlineEntry("答案解析", "part-answers", 0))
+    story.append(Paragraph("答案解析", CHAPTER_TITLE_STYLE))
     story.append(Spacer(1, 12))
 
     for i, q in enumerate(questions, 1):
-        story.append(
-            Paragraph(f"{i}. 参考答案：{q['correct_answer']}", normal_style))
+        flowables = [
+            Paragraph(f"{i}. 参考答案：{q.correct_answer}", NORMAL_STYLE)]
 
-        if q["explanation"]:
-            story.append(Paragraph("解析：", normal_style))
-            story.append(Paragraph(q["explanation"].replace(
-                "\n", "<br/>"), normal_style))
+        if q.explanation:
+            flowables.append(Paragraph("解析：", NORMAL_STYLE))
+            flowables.append(
+                Paragraph(q.explanation.translate(_BR_TRANS), NORMAL_STYLE))
 
-        if q.get("image_path"):
-            img = safe_image(q["image_path"])
-            if img:
-                story.append(Spacer(1, 6))
-                story.append(img)
+        img = safe_image(q.image_path, images)
+        if img:
+            flowables.append(Spacer(1, 6))
+            flowables.append(img)
 
-        story.append(Spacer(1, 12))
+        flowables.append(Spacer(1, 12))
+        story.extend(flowables)
 
     doc.build(story)
-    print(f"✅ 内容PDF已生成：{output_path}")
-
-# === 3. 添加书签（大纲）===
-
-
-def add_bookmarks(pdf_path, questions):
-    from pypdf import PdfReader, PdfWriter
-
-    reader = PdfReader(pdf_path)
-    writer = PdfWriter()
-    for page in reader.pages:
-        writer.add_page(page)
-
-    part1 = writer.add_outline_item("习题", page_number=1)
-    current_page = 1
-
-    for subject_code, subject_group in groupby(questions, key=lambda x: x["subject_code"]):
-        subject_name = SUBJECTS[subject_code]["name"]
-        subj_bm = writer.add_outline_item(
-            subject_name, page_number=current_page, parent=part1)
-
-        for chapter_num, _ in groupby(subject_group, key=lambda x: x["chapter_num"]):
-            chapter_name = SUBJECTS[subject_code]["chapters"][chapter_num]
-            writer.add_outline_item(
-                chapter_name, page_number=current_page, parent=subj_bm)
-            current_page += 1
-
-    answer_page = len(reader.pages) - 1
-    writer.add_outline_item("答案解析", page_number=answer_page)
-
-    final_path = OUTPUT_PDF
-    with open(final_path, "wb") as f:
-        writer.write(f)
-    print(f"✅ 带书签PDF已生成：{final_path}")
-    return final_path
+    print(f"✅ PDF已生成：{output_path}")
 
 # === 主函数 ===
 
@@ -253,17 +330,25 @@ def main():
         print(f"❌ 字体文件不存在，请将 NotoSansSC-Regular.ttf 放入 {font_file.parent} 目录")
         return
 
-    questions = fetch_published_questions()
-    if not questions:
-        print("⚠️ 无已发布题目")
+    # 只读打开要求题库文件已存在
+    if not Path(DB_PATH).exists():
+        print(f"❌ 题库文件不存在: {DB_PATH}")
         return
 
-    print(f"📚 共 {len(questions)} 道题，正在生成PDF...")
-    temp_pdf = "temp_workbook.pdf"
-    generate_content_pdf(questions, temp_pdf)
-    final_pdf = add_bookmarks(temp_pdf, questions)
-    Path(temp_pdf).unlink(missing_ok=True)
-    print(f"\n🎉 完成！最终文件：{final_pdf}")
+    conn = connect_readonly()
+    try:
+        questions = fetch_published_questions(conn)
+        if not questions:
+            print("⚠️ 无已发布题目")
+            return
+
+        print(f"📚 共 {len(questions)} 道题，正在生成PDF...")
+        grouped = group_questions(questions)
+        images = preprocess_images(questions)
+        generate_content_pdf(questions, grouped, images, OUTPUT_PDF)
+        print(f"\n🎉 完成！最终文件：{OUTPUT_PDF}")
+    finally:
+        conn.close()
 
 
 if __name__ == "__main__":
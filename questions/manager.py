@@ -4,11 +4,18 @@
 基于SQLite和Tkinter的可视化题库管理系统
 """
 
-import re
 import json
+import atexit
 import sqlite3
 import shutil
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 from pathlib import Path
@@ -62,6 +69,14 @@ SUBJECTS = {
     }
 }
 
+# 科目/章节名称查找表：SUBJECTS在导入时就定死了，没必要每次查询都JOIN数据库表
+SUBJECT_NAME = {code: info["name"] for code, info in SUBJECTS.items()}
+CHAPTER_NAME = {
+    (subject_code, chapter_num): chapter_name
+    for subject_code, subject_info in SUBJECTS.items()
+    for chapter_num, chapter_name in subject_info["chapters"].items()
+}
+
 QUESTION_TYPES = {
     "single_choice": "单选题",
     "application": "应用题",
@@ -73,18 +88,124 @@ STATUS_TYPES = {
     "deprecated": "已废弃"
 }
 
+# 显示名→代码的反查表，省掉界面回传时的线性扫描
+QUESTION_TYPE_BY_NAME = {name: code for code, name in QUESTION_TYPES.items()}
+STATUS_TYPE_BY_NAME = {name: code for code, name in STATUS_TYPES.items()}
+
+# 各下拉框的选项，导入时生成一次；“全部”哨兵也只存这一份
+ALL_SENTINEL = "全部"
+SUBJECT_VALUES = [
+    f"{code} - {info['name']}" for code, info in SUBJECTS.items()]
+CHAPTER_VALUES = {
+    code: [f"{num} - {name}" for num, name in info["chapters"].items()]
+    for code, info in SUBJECTS.items()
+}
+SUBJECT_COMBO_VALUES = [ALL_SENTINEL] + SUBJECT_VALUES
+TYPE_COMBO_VALUES = [ALL_SENTINEL] + list(QUESTION_TYPES.values())
+
+# 题目记录：字段顺序与questions表列序一致，比17键的dict构造便宜得多
+Question = namedtuple('Question', [
+    'id', 'subject_code', 'chapter_num', 'question_type', 'status',
+    'question_text', 'option_a', 'option_b', 'option_c', 'option_d',
+    'correct_answer', 'explanation', 'knowledge', 'notes',
+    'created_date', 'last_modified', 'image_path',
+])
+
+# 导入JSON时每行必须带齐的键（即全部表列）
+REQUIRED_KEYS = frozenset(Question._fields)
+
+# C实现的取列器：按SQL占位符顺序从dict一把抓出参数元组，
+# 批量导入时比逐键手写索引的纯Python元组构造快得多
+_INSERT_COLS = itemgetter(*Question._fields)
+_UPDATE_COLS = itemgetter(
+    'subject_code', 'chapter_num', 'question_type', 'status', 'question_text',
+    'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer',
+    'explanation', 'knowledge', 'notes')
+
+
+def _build_list_sql_variants():
+    """枚举列表查询的全部筛选组合，导入时一次生成固定SQL
+
+    每个键对应一条文本固定、参数个数固定的语句：不在每次按键时
+    拼接WHERE子串，sqlite3的语句缓存也能按稳定文本次次命中。
+    键为(搜索方式, 是否按科目筛, 是否按题型筛)，搜索方式取
+    ""（无搜索）/"fts"（走倒排索引）/"like"（短词兜底）。
+    """
+    # 科目/章节名在Python侧查SUBJECT_NAME/CHAPTER_NAME，不JOIN静态表
+    select = '''
+        SELECT
+            q.id, q.subject_code, q.chapter_num, q.question_type, q.status,
+            substr(q.question_text, 1, 81) as preview_text
+        FROM questions q
+        WHERE {where}
+        ORDER BY q.id
+    '''
+    search_conds = {
+        "": None,
+        "fts": ("(q.rowid IN (SELECT rowid FROM questions_fts"
+                " WHERE questions_fts MATCH ?) OR q.id LIKE ?)"),
+        "like": "(question_text LIKE ? OR id LIKE ? OR correct_answer LIKE ?)",
+    }
+    variants = {}
+    for search_mode, search_cond in search_conds.items():
+        for has_subject in (False, True):
+            for has_type in (False, True):
+                conditions = [search_cond] if search_cond else []
+                if has_subject:
+                    conditions.append("subject_code = ?")
+                if has_type:
+                    conditions.append("question_type = ?")
+                where = " AND ".join(conditions) if conditions else "1=1"
+                variants[(search_mode, has_subject, has_type)] = \
+                    select.format(where=where)
+    return variants
+
+
+LIST_SQL_VARIANTS = _build_list_sql_variants()
+
+# 附图预览的最大尺寸
+THUMB_MAX_WH = (320, 240)
+
+
+@lru_cache(maxsize=64)
+def _load_thumb(path, mtime):
+    """解码附图并缩成预览尺寸（在工作线程里跑，避免卡住Tk主线程）
+
+    mtime参与缓存键：文件被覆盖后缓存自动失效，重复打开同一张图则直接命中。
+    """
+    image = Image.open(path)
+    image.thumbnail(THUMB_MAX_WH, Image.LANCZOS)
+    image.load()
+    return image
+
 
 class DatabaseManager:
     """数据库管理类"""
 
     def __init__(self, db_path="questions.db"):
         self.db_path = db_path
+        # 长驻连接：每次查询都connect/close会重新打开文件、解析schema，
+        # 搜索框每个按键都要查库，这笔开销直接决定交互延迟
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # 行默认带列名访问，省去按位置手工拆包
+        self.conn.row_factory = sqlite3.Row
+        # 交互式写入（保存、上传图片等）走WAL：提交只追加写日志，
+        # 不用每次都fsync整个回滚日志；会留下-wal/-shm伴生文件
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        # 读路径走mmap省掉read()拷贝；页缓存放大到约20MB，
+        # 题库整库驻留内存后列表/搜索基本不再碰盘
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        self.conn.execute("PRAGMA cache_size=-20000")
+        # 连接会被工作线程共享，用锁串行化访问
+        self.lock = threading.Lock()
+        atexit.register(self.conn.close)
         self.init_database()
 
     def init_database(self):
         """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
 
         # 创建题目表
         cursor.execute('''
@@ -128,52 +249,161 @@ class DatabaseManager:
             )
         ''')
 
+        # 筛选路径的复合索引：按科目/章节和按题型过滤都走B树而非全表扫描。
+        # 末尾带上id DESC，generate_question_id取章节内最大序号时
+        # 连排序都省掉，直接读索引第一条（老的两列索引是它的前缀，删掉）
+        cursor.execute('DROP INDEX IF EXISTS idx_questions_subject_chapter')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_questions_subj_chap_id
+            ON questions(subject_code, chapter_num, id DESC)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_questions_type_status
+            ON questions(question_type, status)
+        ''')
+
+        # 全文索引：LIKE '%x%'带前导通配符只能全表扫描，FTS5倒排索引按词条定位。
+        # unicode61分词器会把整段连续中文切成一个词条，做不了子串匹配，
+        # 这里用trigram分词器（SQLite>=3.34），三字及以上的搜索词都能命中子串
+        fts_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                question_text, correct_answer,
+                content='questions', content_rowid='rowid',
+                tokenize='trigram'
+            )
+        ''')
+        # 触发器保持倒排索引与外部内容表同步
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS questions_fts_ai
+            AFTER INSERT ON questions BEGIN
+                INSERT INTO questions_fts(rowid, question_text, correct_answer)
+                VALUES (new.rowid, new.question_text, new.correct_answer);
+            END;
+            CREATE TRIGGER IF NOT EXISTS questions_fts_ad
+            AFTER DELETE ON questions BEGIN
+                INSERT INTO questions_fts(questions_fts, rowid, question_text, correct_answer)
+                VALUES ('delete', old.rowid, old.question_text, old.correct_answer);
+            END;
+            CREATE TRIGGER IF NOT EXISTS questions_fts_au
+            AFTER UPDATE ON questions BEGIN
+                INSERT INTO questions_fts(questions_fts, rowid, question_text, correct_answer)
+                VALUES ('delete', old.rowid, old.question_text, old.correct_answer);
+                INSERT INTO questions_fts(rowid, question_text, correct_answer)
+                VALUES (new.rowid, new.question_text, new.correct_answer);
+            END;
+        ''')
+        if not fts_exists:
+            # 老库升级：首次建表时从现有题目重建索引
+            cursor.execute(
+                "INSERT INTO questions_fts(questions_fts) VALUES('rebuild')")
+
         # 插入初始数据
         self._insert_initial_data(cursor)
 
-        conn.commit()
-        conn.close()
+        self.conn.commit()
 
     def _insert_initial_data(self, cursor):
         """插入初始的科目和章节数据"""
-        # 插入科目
-        for code, info in SUBJECTS.items():
-            cursor.execute(
-                "INSERT OR IGNORE INTO subjects (code, name) VALUES (?, ?)",
-                (code, info["name"])
-            )
-
-        # 插入章节
-        for subject_code, subject_info in SUBJECTS.items():
-            for chapter_num, chapter_name in subject_info["chapters"].items():
-                cursor.execute(
-                    "INSERT OR IGNORE INTO chapters (subject_code, chapter_num, name) VALUES (?, ?, ?)",
-                    (subject_code, chapter_num, chapter_name)
-                )
+        # executemany复用同一条编译好的语句，避免逐行重新解析SQL
+        cursor.executemany(
+            "INSERT OR IGNORE INTO subjects (code, name) VALUES (?, ?)",
+            [(code, info["name"]) for code, info in SUBJECTS.items()]
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO chapters (subject_code, chapter_num, name) VALUES (?, ?, ?)",
+            [(subject_code, chapter_num, chapter_name)
+             for subject_code, subject_info in SUBJECTS.items()
+             for chapter_num, chapter_name in subject_info["chapters"].items()]
+        )
 
     def get_connection(self):
         """获取数据库连接"""
-        return sqlite3.connect(self.db_path)
+        return self.conn
 
     def execute_query(self, query, params=()):
         """执行查询并返回结果"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        result = cursor.fetchall()
-        conn.close()
-        return result
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def fetch_one(self, query, params=()):
+        """执行查询并返回第一行（无结果时返回None）"""
+        with self.lock:
+            return self.conn.execute(query, params).fetchone()
 
     def execute_update(self, query, params=()):
         """执行更新操作"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        conn.close()
+        with self.lock:
+            self.conn.execute(query, params)
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """显式事务：整批写入合成一次提交，出错整体回滚
+
+        execute_update每次调用都commit，批量写入（如导入）逐行提交会把
+        时间全耗在fsync上。块内直接用yield出的连接执行语句，不要再调
+        execute_update/execute_query（锁不可重入）。
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
 
 
 class QuestionManagerGUI:
+    # 热路径SQL集中成类常量：sqlite3的语句缓存按SQL文本原样做键，
+    # 字符串稳定才能次次命中缓存里已编译好的语句
+    _SQL_LOAD_BY_ID = "SELECT * FROM questions WHERE id = ?"
+    _SQL_EXISTS = "SELECT id FROM questions WHERE id = ?"
+    _SQL_DELETE_QUESTION = "DELETE FROM questions WHERE id = ?"
+    _SQL_UPDATE_IMAGE = "UPDATE questions SET image_path = ? WHERE id = ?"
+    _SQL_CLEAR_IMAGE = "UPDATE questions SET image_path = NULL WHERE id = ?"
+    _SQL_EXPORT = '''
+        SELECT
+            id, subject_code, chapter_num, question_type, status, question_text,
+            option_a, option_b, option_c, option_d, correct_answer,
+            explanation, knowledge, notes, created_date, last_modified, image_path
+        FROM questions
+    '''
+    _SQL_LAST_ID = '''
+        SELECT id FROM questions
+        WHERE subject_code = ? AND chapter_num = ?
+        ORDER BY id DESC LIMIT 1
+    '''
+    _SQL_INSERT_QUESTION = '''
+        INSERT INTO questions (
+            id, subject_code, chapter_num, question_type, status, question_text,
+            option_a, option_b, option_c, option_d, correct_answer,
+            explanation, knowledge, notes, created_date, last_modified, image_path
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    _SQL_UPDATE_QUESTION = '''
+        UPDATE questions SET
+            subject_code = ?, chapter_num = ?, question_type = ?, status = ?, question_text = ?,
+            option_a = ?, option_b = ?, option_c = ?, option_d = ?, correct_answer = ?,
+            explanation = ?, knowledge = ?, notes = ?, last_modified = ?, image_path = ?
+        WHERE id = ?
+    '''
+    # 导入专用UPSERT：新ID走INSERT，已有ID覆盖可编辑列并盖上当天日期
+    # （created_date保留库里的原值），一条预编译语句吃下整批数据
+    _SQL_UPSERT_QUESTION = _SQL_INSERT_QUESTION + '''
+        ON CONFLICT(id) DO UPDATE SET
+            subject_code = excluded.subject_code, chapter_num = excluded.chapter_num,
+            question_type = excluded.question_type, status = excluded.status,
+            question_text = excluded.question_text, option_a = excluded.option_a,
+            option_b = excluded.option_b, option_c = excluded.option_c,
+            option_d = excluded.option_d, correct_answer = excluded.correct_answer,
+            explanation = excluded.explanation, knowledge = excluded.knowledge,
+            notes = excluded.notes, last_modified = ?, image_path = excluded.image_path
+    '''
+
     def __init__(self, root):
         self.root = root
         self.root.title("408题库管理系统")
@@ -191,6 +421,29 @@ class QuestionManagerGUI:
         self.current_image_path = None
         self.image_label = None
 
+        # 搜索防抖定时器
+        self._search_after_id = None
+
+        # 列表刷新代号（丢弃乱序返回的过期查询结果）
+        self._refresh_seq = 0
+
+        # 统计信息是否需要重算（懒更新：只在统计选项卡可见时才算）
+        self._stats_dirty = True
+
+        # 附图预览在线程池里解码，代号用来丢弃过期结果
+        self._thumb_executor = ThreadPoolExecutor(max_workers=2)
+        self._thumb_seq = 0
+
+        # 各章节已分配到的题目序号缓存：首次查库，之后纯内存自增
+        self._next_num = {}
+
+        # 新建题目对话框只搭一次控件树，之后隐藏/复显复用
+        self._create_dialog = None
+
+        # 图片目录建一次存好，上传/复制时不再反复mkdir探测
+        self._images_dir = Path("assets/images")
+        self._images_dir.mkdir(parents=True, exist_ok=True)
+
         # 创建主界面
         self.create_main_interface()
 
@@ -246,8 +499,7 @@ class QuestionManagerGUI:
         ttk.Label(filter_frame, text="科目:").pack(side=tk.LEFT)
         self.filter_subject_var = tk.StringVar(value="all")
         subject_combo = ttk.Combobox(filter_frame, textvariable=self.filter_subject_var,
-                                     values=[
-                                         "全部"] + [f"{code} - {info['name']}" for code, info in SUBJECTS.items()],
+                                     values=SUBJECT_COMBO_VALUES,
                                      state="readonly", width=15)
         subject_combo.pack(side=tk.LEFT, padx=5)
         subject_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
@@ -255,8 +507,7 @@ class QuestionManagerGUI:
         ttk.Label(filter_frame, text="题型:").pack(side=tk.LEFT, padx=(10, 0))
         self.filter_type_var = tk.StringVar(value="all")
         type_combo = ttk.Combobox(filter_frame, textvariable=self.filter_type_var,
-                                  values=["全部"] +
-                                  list(QUESTION_TYPES.values()),
+                                  values=TYPE_COMBO_VALUES,
                                   state="readonly", width=12)
         type_combo.pack(side=tk.LEFT, padx=5)
         type_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
@@ -298,13 +549,13 @@ class QuestionManagerGUI:
         self.tree.column("status", width=60)
         self.tree.column("preview", width=300)
 
-        # 添加滚动条
-        scrollbar = ttk.Scrollbar(
+        # 添加滚动条（保留引用，批量插入时临时摘掉回调）
+        self.tree_scrollbar = ttk.Scrollbar(
             list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.configure(yscrollcommand=self.tree_scrollbar.set)
 
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # 绑定双击事件
         self.tree.bind("<Double-1>", self.on_tree_double_click)
@@ -336,6 +587,9 @@ class QuestionManagerGUI:
         # 构建统计界面
         self.create_stats_tab(self.stats_frame)
 
+        # 统计只在切到统计选项卡时才真正计算
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
     def create_view_tab(self, parent):
         """创建查看题目选项卡"""
         # 使用文本框显示题目内容
@@ -351,10 +605,8 @@ class QuestionManagerGUI:
         scrollbar = ttk.Scrollbar(
             parent, orient=tk.VERTICAL, command=canvas.yview)
         self.scrollable_frame = ttk.Frame(canvas)
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        self.edit_canvas = canvas
+        self._bbox_after = None
         canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
 
@@ -438,6 +690,8 @@ class QuestionManagerGUI:
         self.image_path_var = tk.StringVar()
         ttk.Label(self.image_preview_frame, textvariable=self.image_path_var,
                   foreground="blue").pack(anchor=tk.W)
+        self.image_label = ttk.Label(self.image_preview_frame)
+        self.image_label.pack(anchor=tk.W, pady=(5, 0))
 
         # 选项编辑（单选题）
         self.options_frame = ttk.LabelFrame(self.scrollable_frame, text="选项")
@@ -483,6 +737,23 @@ class QuestionManagerGUI:
             self.scrollable_frame, wrap=tk.WORD, height=3)
         self.notes_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
+        # <Configure>到构建完才挂：否则每pack一个子件都触发一次
+        # bbox("all")全子树测量。建完手动算一次，之后由after_idle合并
+        self.scrollable_frame.update_idletasks()
+        canvas.configure(scrollregion=canvas.bbox("all"))
+        self.scrollable_frame.bind(
+            "<Configure>", self._on_edit_frame_configure)
+
+    def _on_edit_frame_configure(self, event):
+        """编辑区尺寸变化：合并同一批事件，空闲时只重算一次滚动区域"""
+        if self._bbox_after is None:
+            self._bbox_after = self.root.after_idle(
+                self._recompute_scrollregion)
+
+    def _recompute_scrollregion(self):
+        self._bbox_after = None
+        self.edit_canvas.configure(scrollregion=self.edit_canvas.bbox("all"))
+
     def create_stats_tab(self, parent):
         """创建统计信息选项卡"""
         self.stats_text = scrolledtext.ScrolledText(
@@ -490,8 +761,14 @@ class QuestionManagerGUI:
         self.stats_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.stats_text.config(state=tk.DISABLED)
 
+    def on_tab_changed(self, event):
+        """选项卡切换时按需刷新统计信息"""
+        if self.notebook.select() == str(self.stats_frame) and self._stats_dirty:
+            self.refresh_stats_tab()
+
     def refresh_stats_tab(self):
         """刷新统计信息选项卡"""
+        self._stats_dirty = False
         self.stats_text.config(state=tk.NORMAL)
         self.stats_text.delete(1.0, tk.END)
 
@@ -514,119 +791,191 @@ class QuestionManagerGUI:
 
     def get_statistics(self):
         """获取统计信息"""
-        # 总题目数
-        total = self.db.execute_query("SELECT COUNT(*) FROM questions")[0][0]
-
+        # 一条GROUP BY扫描拿到全部科目×题型的计数，
+        # 不再是总数一次查询、每个科目再各查一次
         stats = {
-            'total_questions': total,
-            'subjects': {}
+            'total_questions': 0,
+            'subjects': {
+                subject_info['name']: {'total': 0, 'types': {}}
+                for subject_info in SUBJECTS.values()
+            }
         }
 
-        # 各科目统计
-        for subject_code, subject_info in SUBJECTS.items():
-            subject_name = subject_info['name']
-            subject_stats = self.db.execute_query('''
-                SELECT 
-                    COUNT(*) as total,
-                    question_type,
-                    COUNT(*) as type_count
-                FROM questions 
-                WHERE subject_code = ?
-                GROUP BY question_type
-            ''', (subject_code,))
-
-            type_counts = {}
-            total_subject = 0
-
-            for row in subject_stats:
-                type_name = QUESTION_TYPES.get(row[1], row[1])
-                type_counts[type_name] = row[2]
-                total_subject += row[2]
-
-            stats['subjects'][subject_name] = {
-                'total': total_subject,
-                'types': type_counts
-            }
+        rows = self.db.execute_query('''
+            SELECT subject_code, question_type, COUNT(*)
+            FROM questions
+            GROUP BY subject_code, question_type
+        ''')
+
+        for subject_code, question_type, count in rows:
+            subject_name = SUBJECT_NAME.get(subject_code, subject_code)
+            subject_stats = stats['subjects'].setdefault(
+                subject_name, {'total': 0, 'types': {}})
+            type_name = QUESTION_TYPES.get(question_type, question_type)
+            subject_stats['types'][type_name] = count
+            subject_stats['total'] += count
+            stats['total_questions'] += count
 
         return stats
 
     def refresh_question_list(self, search_term=None, subject_filter=None, type_filter=None):
-        """刷新题目列表"""
-        # 清空现有列表
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # 构建查询条件
-        conditions = []
+        """刷新题目列表：查库放到工作线程，避免阻塞Tk主线程"""
+        query, params = self._build_list_query(
+            search_term, subject_filter, type_filter)
+
+        # 递增代号，保证乱序完成的旧查询结果不会覆盖新结果
+        self._refresh_seq += 1
+        threading.Thread(
+            target=self._fetch_questions,
+            args=(query, params, self._refresh_seq),
+            daemon=True,
+        ).start()
+
+    def _build_list_query(self, search_term, subject_filter, type_filter):
+        """根据搜索词和筛选条件选取列表查询变体并组参数"""
         params = []
 
+        search_mode = ""
         if search_term and search_term.strip():
-            conditions.append(
-                "(question_text LIKE ? OR id LIKE ? OR correct_answer LIKE ?)")
-            search_pattern = f"%{search_term}%"
-            params.extend([search_pattern, search_pattern, search_pattern])
-
-        if subject_filter and subject_filter != "all":
-            subject_code = subject_filter.split(" - ")[0]
-            conditions.append("subject_code = ?")
-            params.append(subject_code)
-
-        if type_filter and type_filter != "all":
-            # 找到题型代码
-            type_code = None
-            for code, name in QUESTION_TYPES.items():
-                if name == type_filter:
-                    type_code = code
-                    break
-            if type_code:
-                conditions.append("question_type = ?")
-                params.append(type_code)
-
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
-
-        # 查询题目
-        query = f'''
-            SELECT 
-                q.id, q.subject_code, q.chapter_num, q.question_type, q.status, 
-                q.question_text,
-                s.name as subject_name,
-                c.name as chapter_name
-            FROM questions q
-            LEFT JOIN subjects s ON q.subject_code = s.code
-            LEFT JOIN chapters c ON q.subject_code = c.subject_code AND q.chapter_num = c.chapter_num
-            WHERE {where_clause}
-            ORDER BY q.id
-        '''
-
+            term = search_term.strip()
+            if len(term) >= 3:
+                # 走FTS5倒排索引；trigram分词最短匹配三个字符，
+                # 搜索词整体加引号按短语匹配。题号不在索引里，仍用LIKE
+                search_mode = "fts"
+                params.extend(
+                    ['"' + term.replace('"', '""') + '"', f"%{term}%"])
+            else:
+                # 不足三个字符的短词（如单个汉字）用LIKE兜底
+                search_mode = "like"
+                search_pattern = f"%{term}%"
+                params.extend(
+                    [search_pattern, search_pattern, search_pattern])
+
+        has_subject = bool(subject_filter) and subject_filter != "all"
+        if has_subject:
+            params.append(subject_filter.partition(" - ")[0])
+
+        type_code = (QUESTION_TYPE_BY_NAME.get(type_filter)
+                     if type_filter and type_filter != "all" else None)
+        if type_code:
+            params.append(type_code)
+
+        # 从预生成的固定变体里取SQL，文本稳定、参数个数与之对应
+        query = LIST_SQL_VARIANTS[(search_mode, has_subject, bool(type_code))]
+        return query, params
+
+    def _fetch_questions(self, query, params, seq):
+        """（工作线程）执行查询，结果交回主线程应用"""
         questions = self.db.execute_query(query, params)
+        self.root.after(0, self._apply_questions, questions, seq)
 
-        # 添加到树形视图
+    def _apply_questions(self, questions, seq):
+        """（主线程）用查询结果重建题目列表"""
+        if seq != self._refresh_seq:
+            return  # 已有更新的查询在路上，丢弃过期结果
+
+        # 一次Tcl调用清空整个列表
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+
+        # 先在Python侧备好所有行的值元组
+        values_list = []
         for q in questions:
-            question_id, subject_code, chapter_num, q_type, status, question_text, subject_name, chapter_name = q
+            question_id, subject_code, chapter_num, q_type, status, preview_text = q
 
-            # 提取题面前50个字符作为预览
-            preview = question_text[:80] + \
-                "..." if len(question_text) > 80 else question_text
+            # 截断在SQL里用substr做掉（取81个字符判断是否超长），
+            # 长题面不用整段跨进程边界传过来
+            preview = preview_text[:80] + \
+                "..." if len(preview_text) == 81 else preview_text
 
-            self.tree.insert("", tk.END, values=(
+            values_list.append((
                 question_id,
-                subject_name,
-                chapter_name,
+                SUBJECT_NAME.get(subject_code, subject_code),
+                CHAPTER_NAME.get((subject_code, chapter_num), chapter_num),
                 QUESTION_TYPES.get(q_type, q_type),
                 STATUS_TYPES.get(status, status),
                 preview
             ))
 
-        # 同时刷新统计信息
-        self.refresh_stats_tab()
+        # 插入期间摘掉滚动条回调，避免每行一次滚动条重算。
+        # 行iid直接用题目ID，单条增删改能按ID定位而不用扫整个列表
+        self.tree.configure(yscrollcommand="")
+        for values in values_list:
+            self.tree.insert("", tk.END, iid=values[0], values=values)
+        self.tree.configure(yscrollcommand=self.tree_scrollbar.set)
+
+        self._invalidate_stats()
+
+    def _invalidate_stats(self):
+        """题目数据有变：统计标脏，统计选项卡正可见则立即重算"""
+        self._stats_dirty = True
+        if self.notebook.select() == str(self.stats_frame):
+            self.refresh_stats_tab()
+
+    @staticmethod
+    def _tree_row_values(question_data):
+        """由题目dict组一行Treeview列值（与_apply_questions的列序一致）"""
+        text = question_data['question_text']
+        preview = text[:80] + "..." if len(text) > 80 else text
+        subject_code = question_data['subject_code']
+        chapter_num = question_data['chapter_num']
+        return (
+            question_data['id'],
+            SUBJECT_NAME.get(subject_code, subject_code),
+            CHAPTER_NAME.get((subject_code, chapter_num), chapter_num),
+            QUESTION_TYPES.get(question_data['question_type'],
+                               question_data['question_type']),
+            STATUS_TYPES.get(question_data['status'],
+                             question_data['status']),
+            preview,
+        )
+
+    def _insert_tree_row(self, question_data):
+        """单条新增：按ID序插一行，不整表重查重建"""
+        question_id = question_data['id']
+        if self.tree.exists(question_id):
+            self._update_tree_row(question_id, question_data)
+            return
+        # 列表按ID有序，二分找插入位置
+        index = bisect_left(self.tree.get_children(), question_id)
+        self.tree.insert("", index, iid=question_id,
+                         values=self._tree_row_values(question_data))
+        self._invalidate_stats()
+
+    def _update_tree_row(self, question_id, question_data):
+        """单条更新：原地改行值（行可能因筛选不在列表里）"""
+        if self.tree.exists(question_id):
+            self.tree.item(
+                question_id, values=self._tree_row_values(question_data))
+        self._invalidate_stats()
+
+    def _remove_tree_row(self, question_id):
+        """单条删除：按iid摘掉对应行"""
+        if self.tree.exists(question_id):
+            self.tree.delete(question_id)
+        self._invalidate_stats()
 
     def on_search(self, event):
-        """搜索框内容变化时的处理"""
+        """搜索框内容变化时的处理（防抖：停顿200ms后才真正查询）
+
+        每个按键都立刻查库并重建列表的话，连续输入会触发一串无用的
+        SQL和界面刷新，只有最后一次才是用户想要的结果。
+        """
+        if self._search_after_id is not None:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(200, self._do_search)
+
+    def _do_search(self):
+        """防抖结束后执行实际的搜索/筛选"""
+        self._search_after_id = None
         search_term = self.search_var.get()
-        subject_filter = self.filter_subject_var.get(
-        ) if self.filter_subject_var.get() != "全部" else None
-        type_filter = self.filter_type_var.get(
-        ) if self.filter_type_var.get() != "全部" else None
+        subject_filter = self.filter_subject_var.get()
+        if subject_filter == ALL_SENTINEL:
+            subject_filter = None
+        type_filter = self.filter_type_var.get()
+        if type_filter == ALL_SENTINEL:
+            type_filter = None
         self.refresh_question_list(search_term, subject_filter, type_filter)
 
     def on_filter_change(self, event):
@@ -645,37 +994,14 @@ class QuestionManagerGUI:
         """加载题目到查看和编辑界面"""
         self.current_question_id = question_id
 
-        # 从数据库查询题目
-        query = '''
-            SELECT * FROM questions WHERE id = ?
-        '''
-        result = self.db.execute_query(query, (question_id,))
+        # 从数据库查询题目；行工厂是sqlite3.Row，直接按列名转成dict
+        row = self.db.fetch_one(self._SQL_LOAD_BY_ID, (question_id,))
 
-        if not result:
+        if row is None:
             messagebox.showerror("错误", f"未找到题目 {question_id}")
             return
 
-        # 解析结果
-        row = result[0]
-        question_data = {
-            'id': row[0],
-            'subject_code': row[1],
-            'chapter_num': row[2],
-            'question_type': row[3],
-            'status': row[4],
-            'question_text': row[5],
-            'option_a': row[6],
-            'option_b': row[7],
-            'option_c': row[8],
-            'option_d': row[9],
-            'correct_answer': row[10],
-            'explanation': row[11],
-            'knowledge': row[12],
-            'notes': row[13],
-            'created_date': row[14],
-            'last_modified': row[15],
-            'image_path': row[16]
-        }
+        question_data = Question(*row)
 
         # 保存当前题目数据
         self.current_question_data = question_data
@@ -694,90 +1020,134 @@ class QuestionManagerGUI:
         self.view_text.config(state=tk.NORMAL)
         self.view_text.delete(1.0, tk.END)
 
-        # 构建显示内容
-        display_text = f"题目ID: {question_data['id']}\n"
-        display_text += f"科目: {SUBJECTS[question_data['subject_code']]['name']}\n"
-        display_text += f"章节: {SUBJECTS[question_data['subject_code']]['chapters'][question_data['chapter_num']]}\n"
-        display_text += f"题型: {QUESTION_TYPES.get(question_data['question_type'], question_data['question_type'])}\n"
-        display_text += f"状态: {STATUS_TYPES.get(question_data['status'], question_data['status'])}\n"
-        display_text += f"创建日期: {question_data['created_date']}\n"
-        display_text += f"修改日期: {question_data['last_modified']}\n"
+        # 构建显示内容：片段收进列表最后一次join，
+        # 避免十几次+=逐段重新分配字符串
+        parts = [
+            f"题目ID: {question_data.id}\n",
+            f"科目: {SUBJECTS[question_data.subject_code]['name']}\n",
+            f"章节: {SUBJECTS[question_data.subject_code]['chapters'][question_data.chapter_num]}\n",
+            f"题型: {QUESTION_TYPES.get(question_data.question_type, question_data.question_type)}\n",
+            f"状态: {STATUS_TYPES.get(question_data.status, question_data.status)}\n",
+            f"创建日期: {question_data.created_date}\n",
+            f"修改日期: {question_data.last_modified}\n",
+        ]
 
         # 显示图片信息
-        if question_data['image_path']:
-            display_text += f"附图: {question_data['image_path']}\n"
+        if question_data.image_path:
+            parts.append(f"附图: {question_data.image_path}\n")
 
-        display_text += "\n" + "="*50 + "\n\n"
-        display_text += f"{question_data['question_text']}\n\n"
+        parts.append("\n" + "="*50 + "\n\n")
+        parts.append(f"{question_data.question_text}\n\n")
 
         # 如果是单选题，显示选项
-        if question_data['question_type'] == 'single_choice':
-            options = []
-            for letter in ['A', 'B', 'C', 'D']:
-                option_value = question_data.get(f'option_{letter.lower()}')
-                if option_value:
-                    options.append(f"{letter}. {option_value}")
-
+        if question_data.question_type == 'single_choice':
+            options = "\n".join(
+                f"{letter}. {value}"
+                for letter, value in zip("ABCD", (
+                    question_data.option_a, question_data.option_b,
+                    question_data.option_c, question_data.option_d))
+                if value)
             if options:
-                display_text += "选项:\n" + "\n".join(options) + "\n\n"
+                parts.append("选项:\n" + options + "\n\n")
 
-        display_text += f"参考答案: {question_data['correct_answer']}\n\n"
+        parts.append(f"参考答案: {question_data.correct_answer}\n\n")
 
-        if question_data['explanation']:
-            display_text += "解析:\n" + question_data['explanation'] + "\n\n"
+        if question_data.explanation:
+            parts.append("解析:\n" + question_data.explanation + "\n\n")
 
-        if question_data['knowledge']:
-            display_text += "相关知识技巧:\n" + question_data['knowledge'] + "\n\n"
+        if question_data.knowledge:
+            parts.append("相关知识技巧:\n" + question_data.knowledge + "\n\n")
 
-        if question_data['notes']:
-            display_text += "备注:\n" + question_data['notes'] + "\n"
+        if question_data.notes:
+            parts.append("备注:\n" + question_data.notes + "\n")
 
-        self.view_text.insert(1.0, display_text)
+        self.view_text.insert(1.0, "".join(parts))
         self.view_text.config(state=tk.DISABLED)
 
     def update_edit_tab(self, question_data):
         """更新编辑选项卡内容"""
         # 更新基本信息
-        self.id_var.set(question_data['id'])
-        self.status_var.set(question_data['status'])
+        self.id_var.set(question_data.id)
+        self.status_var.set(question_data.status)
         self.type_var.set(QUESTION_TYPES.get(
-            question_data['question_type'], question_data['question_type']))
+            question_data.question_type, question_data.question_type))
 
         # 题面
         self.question_text.delete(1.0, tk.END)
-        self.question_text.insert(1.0, question_data['question_text'])
+        self.question_text.insert(1.0, question_data.question_text)
 
         # 更新图片信息
-        self.current_image_path = question_data.get('image_path')
+        self.current_image_path = question_data.image_path
         if self.current_image_path:
             self.image_path_var.set(f"当前图片: {self.current_image_path}")
         else:
             self.image_path_var.set("未上传图片")
 
         # 如果是单选题，显示选项
-        if question_data['question_type'] == 'single_choice':
+        if question_data.question_type == 'single_choice':
             for letter in ['A', 'B', 'C', 'D']:
                 var = self.option_vars[letter]
-                var.set(question_data.get(f'option_{letter.lower()}', ''))
+                var.set(getattr(
+                    question_data, f'option_{letter.lower()}') or '')
             self.options_frame.pack(fill=tk.X, padx=10, pady=5)
         else:
             # 应用题不需要选项，隐藏选项框架
             self.options_frame.pack_forget()
 
         # 参考答案
-        self.answer_var.set(question_data['correct_answer'])
+        self.answer_var.set(question_data.correct_answer)
 
         # 解析
         self.explanation_text.delete(1.0, tk.END)
-        self.explanation_text.insert(1.0, question_data['explanation'] or '')
+        self.explanation_text.insert(1.0, question_data.explanation or '')
 
         # 相关知识技巧
         self.knowledge_text.delete(1.0, tk.END)
-        self.knowledge_text.insert(1.0, question_data['knowledge'] or '')
+        self.knowledge_text.insert(1.0, question_data.knowledge or '')
 
         # 备注
         self.notes_text.delete(1.0, tk.END)
-        self.notes_text.insert(1.0, question_data['notes'] or '')
+        self.notes_text.insert(1.0, question_data.notes or '')
+
+        # 附图预览
+        self._show_image_preview(self.current_image_path)
+
+    def _show_image_preview(self, image_path):
+        """异步加载附图预览：解码丢给线程池，主线程只做贴图"""
+        self._thumb_seq += 1
+        seq = self._thumb_seq
+
+        if not image_path or not Path(image_path).exists():
+            self.image_label.configure(image="")
+            self.image_label.image = None
+            return
+
+        def worker():
+            try:
+                thumb = _load_thumb(image_path, Path(image_path).stat().st_mtime)
+            except OSError:
+                # 文件损坏或读取失败：也要回主线程清掉上一题的缩略图
+                self.root.after(0, self._clear_thumb, seq)
+                return
+            self.root.after(0, self._apply_thumb, thumb, seq)
+
+        self._thumb_executor.submit(worker)
+
+    def _clear_thumb(self, seq):
+        """（主线程）附图加载失败时清空预览，防止残留上一题的图"""
+        if seq != self._thumb_seq:
+            return  # 用户已经切到别的题目，不要动新题的预览
+        self.image_label.configure(image="")
+        self.image_label.image = None
+
+    def _apply_thumb(self, thumb, seq):
+        """（主线程）把解码好的缩略图贴到预览标签上"""
+        if seq != self._thumb_seq:
+            return  # 用户已经切到别的题目，丢弃过期缩略图
+        # PhotoImage必须在主线程创建，并保引用防止被回收
+        photo = ImageTk.PhotoImage(thumb)
+        self.image_label.configure(image=photo)
+        self.image_label.image = photo
 
     def upload_image(self):
         """上传图片"""
@@ -794,33 +1164,43 @@ class QuestionManagerGUI:
         if not file_path:
             return
 
-        # 创建图片目录
-        image_dir = Path("assets/images")
-        image_dir.mkdir(parents=True, exist_ok=True)
-
         # 生成新的图片文件名
         file_extension = Path(file_path).suffix
         new_image_name = f"{self.current_question_id}{file_extension}"
-        new_image_path = image_dir / new_image_name
+        new_image_path = self._images_dir / new_image_name
 
-        try:
-            # 复制图片到目标目录
-            shutil.copy2(file_path, new_image_path)
+        # 大图复制可能卡上几百毫秒，放进线程做，期间界面保持可响应
+        question_id = self.current_question_id
+        self.image_path_var.set("上传中...")
 
-            # 更新数据库
-            self.db.execute_update(
-                "UPDATE questions SET image_path = ? WHERE id = ?",
-                (str(new_image_path), self.current_question_id)
-            )
+        def worker():
+            try:
+                shutil.copy2(file_path, new_image_path)
+            except Exception as e:
+                self.root.after(0, self._on_image_upload_failed, e)
+            else:
+                self.root.after(0, self._on_image_copied,
+                                question_id, new_image_path)
 
-            # 更新界面
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_image_copied(self, question_id, new_image_path):
+        """（主线程）图片复制完成：更新数据库并刷新界面"""
+        self.db.execute_update(
+            self._SQL_UPDATE_IMAGE, (str(new_image_path), question_id))
+
+        # 复制期间用户可能已切到别的题目，界面只在还停在原题时更新
+        if question_id == self.current_question_id:
             self.current_image_path = str(new_image_path)
-            self.image_path_var.set(f"当前图片: {new_image_name}")
+            self.image_path_var.set(f"当前图片: {new_image_path.name}")
+            self._show_image_preview(self.current_image_path)
 
-            messagebox.showinfo("成功", "图片上传成功!")
+        messagebox.showinfo("成功", "图片上传成功!")
 
-        except Exception as e:
-            messagebox.showerror("错误", f"图片上传失败: {e}")
+    def _on_image_upload_failed(self, error):
+        """（主线程）图片复制失败：恢复提示并报错"""
+        self.image_path_var.set("未上传图片")
+        messagebox.showerror("错误", f"图片上传失败: {error}")
 
     def delete_image(self):
         """删除图片"""
@@ -833,19 +1213,19 @@ class QuestionManagerGUI:
             return
 
         try:
-            # 删除图片文件
-            if Path(self.current_image_path).exists():
-                Path(self.current_image_path).unlink()
+            # 删除图片文件（missing_ok一步到位，不先stat再unlink）
+            Path(self.current_image_path).unlink(missing_ok=True)
 
             # 更新数据库
             self.db.execute_update(
-                "UPDATE questions SET image_path = NULL WHERE id = ?",
+                self._SQL_CLEAR_IMAGE,
                 (self.current_question_id,)
             )
 
             # 更新界面
             self.current_image_path = None
             self.image_path_var.set("未上传图片")
+            self._show_image_preview(None)
 
             messagebox.showinfo("成功", "图片删除成功!")
 
@@ -853,12 +1233,21 @@ class QuestionManagerGUI:
             messagebox.showerror("错误", f"图片删除失败: {e}")
 
     def create_new_question_dialog(self):
-        """创建新题目对话框"""
+        """弹出新建题目对话框（控件树只搭一次，之后隐藏/复显复用）"""
+        if self._create_dialog is not None:
+            self._reset_create_dialog()
+            self._create_dialog.deiconify()
+            self._create_dialog.grab_set()
+            return
+
         dialog = tk.Toplevel(self.root)
         dialog.title("创建新题目")
         dialog.geometry("500x300")
         dialog.transient(self.root)
         dialog.grab_set()
+        # 关闭按钮同样只是隐藏，别把缓存的控件树销毁掉
+        dialog.protocol("WM_DELETE_WINDOW", self._close_create_dialog)
+        self._create_dialog = dialog
 
         # 科目选择
         subject_frame = ttk.Frame(dialog)
@@ -866,8 +1255,7 @@ class QuestionManagerGUI:
         ttk.Label(subject_frame, text="科目:").pack(side=tk.LEFT)
         self.new_subject_var = tk.StringVar()
         subject_combo = ttk.Combobox(subject_frame, textvariable=self.new_subject_var,
-                                     values=[
-                                         f"{code} - {info['name']}" for code, info in SUBJECTS.items()],
+                                     values=SUBJECT_VALUES,
                                      state="readonly")
         subject_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
@@ -896,24 +1284,34 @@ class QuestionManagerGUI:
         button_frame = ttk.Frame(dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=20)
 
-        ttk.Button(button_frame, text="创建", command=lambda: self.create_question_from_dialog(
-            dialog)).pack(side=tk.RIGHT, padx=5)
-        ttk.Button(button_frame, text="取消", command=dialog.destroy).pack(
+        ttk.Button(button_frame, text="创建", command=self.create_question_from_dialog).pack(
+            side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="取消", command=self._close_create_dialog).pack(
             side=tk.RIGHT, padx=5)
 
+    def _reset_create_dialog(self):
+        """把复用的新建对话框恢复到首次弹出时的空白状态"""
+        self.new_subject_var.set("")
+        self.new_chapter_var.set("")
+        self.chapter_combo['values'] = ()
+        self.new_type_var.set("单选题")
+
+    def _close_create_dialog(self):
+        """收起新建对话框：withdraw隐藏而非destroy，下次直接复显"""
+        self._create_dialog.grab_release()
+        self._create_dialog.withdraw()
+
     def on_subject_selected(self, event):
         """科目选择变化时更新章节选项"""
         subject_str = self.new_subject_var.get()
         if subject_str:
-            subject_code = subject_str.split(" - ")[0]
-            chapters = SUBJECTS[subject_code]["chapters"]
-            chapter_values = [f"{num} - {name}" for num,
-                              name in chapters.items()]
+            subject_code = subject_str.partition(" - ")[0]
+            chapter_values = CHAPTER_VALUES[subject_code]
             self.chapter_combo['values'] = chapter_values
             if chapter_values:
                 self.chapter_combo.set(chapter_values[0])
 
-    def create_question_from_dialog(self, dialog):
+    def create_question_from_dialog(self):
         """从对话框创建新题目"""
         subject_str = self.new_subject_var.get()
         chapter_str = self.new_chapter_var.get()
@@ -923,16 +1321,12 @@ class QuestionManagerGUI:
             messagebox.showerror("错误", "请选择科目和章节")
             return
 
-        # 解析科目和章节
-        subject_code = subject_str.split(" - ")[0]
-        chapter_num = chapter_str.split(" - ")[0]
+        # 解析科目和章节（partition不建列表，只取分隔符前半段）
+        subject_code = subject_str.partition(" - ")[0]
+        chapter_num = chapter_str.partition(" - ")[0]
 
         # 查找题型代码
-        question_type_code = None
-        for code, name in QUESTION_TYPES.items():
-            if name == question_type_str:
-                question_type_code = code
-                break
+        question_type_code = QUESTION_TYPE_BY_NAME.get(question_type_str)
 
         if not question_type_code:
             messagebox.showerror("错误", "无效的题型")
@@ -966,81 +1360,69 @@ class QuestionManagerGUI:
         # 保存题目到数据库
         self.insert_question(question_data)
 
-        # 刷新列表并加载新题目
-        self.refresh_question_list()
+        # 列表单条插入，加载新题目
+        self._insert_tree_row(question_data)
         self.load_question(question_id)
 
-        # 关闭对话框
-        dialog.destroy()
+        # 收起对话框
+        self._close_create_dialog()
 
         messagebox.showinfo("成功", f"题目 {question_id} 创建成功!")
 
     def generate_question_id(self, subject_code: str, chapter_num: str) -> str:
         """生成新的题目ID"""
-        # 查询该章节下已有的最大序号
-        query = '''
-            SELECT id FROM questions 
-            WHERE subject_code = ? AND chapter_num = ?
-            ORDER BY id DESC LIMIT 1
-        '''
-        result = self.db.execute_query(query, (subject_code, chapter_num))
+        key = (subject_code, chapter_num)
+
+        if key not in self._next_num:
+            # 首次分配：查一次该章节下已有的最大序号作基数。
+            # 序号固定是ID末6位数字，直接切片转int，不必每次编译正则
+            last_num = 0
+            result = self.db.execute_query(self._SQL_LAST_ID, key)
+            if result:
+                try:
+                    last_num = int(result[0][0][-6:])
+                except ValueError:
+                    pass
+            self._next_num[key] = last_num
+
+        new_num = self._next_num[key] + 1
+        self._next_num[key] = new_num
+        return f"{subject_code}{chapter_num}{new_num:06d}"
 
-        if result:
-            # 提取已有文件的最大序号
-            last_id = result[0][0]
-            match = re.match(rf"{subject_code}{chapter_num}(\d{{6}})", last_id)
-            if match:
-                last_num = int(match.group(1))
-                new_num = last_num + 1
-            else:
-                new_num = 1
-        else:
-            new_num = 1
+    @staticmethod
+    def _insert_params(question_data):
+        """按INSERT语句的占位符顺序组参数元组"""
+        return _INSERT_COLS(question_data)
 
-        return f"{subject_code}{chapter_num}{new_num:06d}"
+    @staticmethod
+    def _update_params(question_data, today=None):
+        """按UPDATE语句的占位符顺序组参数元组（顺带盖新修改日期）
+
+        批量调用时把算好的today传进来，免得每行格式化一次当天日期。
+        """
+        if today is None:
+            today = datetime.now().strftime("%Y-%m-%d")
+        return _UPDATE_COLS(question_data) + (
+            today, question_data['image_path'], question_data['id'])
 
     def insert_question(self, question_data):
         """插入新题目到数据库"""
-        query = '''
-            INSERT INTO questions (
-                id, subject_code, chapter_num, question_type, status, question_text,
-                option_a, option_b, option_c, option_d, correct_answer,
-                explanation, knowledge, notes, created_date, last_modified, image_path
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        '''
-
-        params = (
-            question_data['id'], question_data['subject_code'], question_data['chapter_num'],
-            question_data['question_type'], question_data['status'], question_data['question_text'],
-            question_data['option_a'], question_data['option_b'], question_data['option_c'],
-            question_data['option_d'], question_data['correct_answer'],
-            question_data['explanation'], question_data['knowledge'], question_data['notes'],
-            question_data['created_date'], question_data['last_modified'], question_data['image_path']
-        )
-
-        self.db.execute_update(query, params)
+        self.db.execute_update(
+            self._SQL_INSERT_QUESTION, self._insert_params(question_data))
 
     def update_question(self, question_data):
         """更新题目到数据库"""
-        query = '''
-            UPDATE questions SET
-                subject_code = ?, chapter_num = ?, question_type = ?, status = ?, question_text = ?,
-                option_a = ?, option_b = ?, option_c = ?, option_d = ?, correct_answer = ?,
-                explanation = ?, knowledge = ?, notes = ?, last_modified = ?, image_path = ?
-            WHERE id = ?
-        '''
-
-        params = (
-            question_data['subject_code'], question_data['chapter_num'], question_data['question_type'],
-            question_data['status'], question_data['question_text'], question_data['option_a'],
-            question_data['option_b'], question_data['option_c'], question_data['option_d'],
-            question_data['correct_answer'], question_data['explanation'],
-            question_data['knowledge'], question_data['notes'], datetime.now().strftime(
-                "%Y-%m-%d"),
-            question_data['image_path'], question_data['id']
-        )
+        self.db.execute_update(
+            self._SQL_UPDATE_QUESTION, self._update_params(question_data))
 
-        self.db.execute_update(query, params)
+    @staticmethod
+    def _text(widget):
+        """取Text控件的全文。
+
+        用"end-1c"跳过Tk自动追加的末尾换行，大段文本不必为去掉
+        一个换行符整体复制一遍，strip多数情况下原样返回。
+        """
+        return widget.get("1.0", "end-1c").strip()
 
     def save_current_question(self):
         """保存当前编辑的题目"""
@@ -1049,7 +1431,7 @@ class QuestionManagerGUI:
             return
 
         # 收集编辑界面的数据
-        question_text = self.question_text.get(1.0, tk.END).strip()
+        question_text = self._text(self.question_text)
 
         # 如果是单选题，收集选项
         options = {}
@@ -1059,9 +1441,9 @@ class QuestionManagerGUI:
                 options[letter] = option_text
 
         correct_answer = self.answer_var.get().strip()
-        explanation = self.explanation_text.get(1.0, tk.END).strip()
-        knowledge = self.knowledge_text.get(1.0, tk.END).strip()
-        notes = self.notes_text.get(1.0, tk.END).strip()
+        explanation = self._text(self.explanation_text)
+        knowledge = self._text(self.knowledge_text)
+        notes = self._text(self.notes_text)
 
         # 验证必要字段
         if not question_text:
@@ -1071,8 +1453,8 @@ class QuestionManagerGUI:
         # 构建题目数据
         question_data = {
             "id": self.current_question_id,
-            "subject_code": self.current_question_data["subject_code"],
-            "chapter_num": self.current_question_data["chapter_num"],
+            "subject_code": self.current_question_data.subject_code,
+            "chapter_num": self.current_question_data.chapter_num,
             "question_type": self.get_question_type_code(),
             "status": self.status_var.get(),
             "question_text": question_text,
@@ -1084,23 +1466,29 @@ class QuestionManagerGUI:
             "explanation": explanation,
             "knowledge": knowledge,
             "notes": notes,
-            "created_date": self.current_question_data["created_date"],
+            "created_date": self.current_question_data.created_date,
             "image_path": self.current_image_path
         }
 
+        # 逐字段与当前加载的数据比对，没有改动就不写库不刷新
+        # （空串与NULL视作相同，文本框取出的空值和库里的None才不会误判）
+        if all((value or "") == (getattr(self.current_question_data, key) or "")
+               for key, value in question_data.items()):
+            return
+
         # 更新题目
         self.update_question(question_data)
 
-        # 刷新列表
-        self.refresh_question_list()
+        # 同步内存快照，连续保存时脏检查仍然准确
+        self.current_question_data = self.current_question_data._replace(
+            **question_data)
+
+        # 列表单条更新
+        self._update_tree_row(self.current_question_id, question_data)
 
     def get_question_type_code(self):
         """获取当前选择的题型代码"""
-        type_name = self.type_var.get()
-        for code, name in QUESTION_TYPES.items():
-            if name == type_name:
-                return code
-        return "single_choice"
+        return QUESTION_TYPE_BY_NAME.get(self.type_var.get(), "single_choice")
 
     def reset_edit_form(self):
         """重置编辑表单"""
@@ -1120,6 +1508,7 @@ class QuestionManagerGUI:
             self.notes_text.delete(1.0, tk.END)
             self.image_path_var.set("未上传图片")
             self.current_image_path = None
+            self._show_image_preview(None)
 
     def delete_current_question(self):
         """删除当前题目"""
@@ -1132,17 +1521,22 @@ class QuestionManagerGUI:
         if result:
             try:
                 # 删除关联的图片文件
-                if self.current_image_path and Path(self.current_image_path).exists():
-                    Path(self.current_image_path).unlink()
+                if self.current_image_path:
+                    Path(self.current_image_path).unlink(missing_ok=True)
 
                 # 从数据库删除题目
                 self.db.execute_update(
-                    "DELETE FROM questions WHERE id = ?", (self.current_question_id,))
+                    self._SQL_DELETE_QUESTION, (self.current_question_id,))
+                # 被删的可能正是该章节的最大序号，缓存的基数作废
+                self._next_num.pop(
+                    (self.current_question_data.subject_code,
+                     self.current_question_data.chapter_num), None)
+                deleted_id = self.current_question_id
                 self.current_question_id = None
                 self.current_question_data = None
                 self.current_image_path = None
                 self.reset_edit_form()
-                self.refresh_question_list()
+                self._remove_tree_row(deleted_id)
                 messagebox.showinfo("成功", "题目删除成功!")
             except Exception as e:
                 messagebox.showerror("错误", f"删除题目失败: {e}")
@@ -1154,31 +1548,32 @@ class QuestionManagerGUI:
             return
 
         # 生成新的题目ID
-        subject_code = self.current_question_data["subject_code"]
-        chapter_num = self.current_question_data["chapter_num"]
+        subject_code = self.current_question_data.subject_code
+        chapter_num = self.current_question_data.chapter_num
         new_question_id = self.generate_question_id(subject_code, chapter_num)
 
-        # 复制题目数据
-        new_question_data = self.current_question_data.copy()
+        # 复制题目数据（插入/更新路径仍按键取值，转回dict）
+        today = datetime.now().strftime("%Y-%m-%d")
+        new_question_data = self.current_question_data._asdict()
         new_question_data["id"] = new_question_id
-        new_question_data["created_date"] = datetime.now().strftime("%Y-%m-%d")
-        new_question_data["last_modified"] = datetime.now().strftime(
-            "%Y-%m-%d")
+        new_question_data["created_date"] = today
+        new_question_data["last_modified"] = today
         new_question_data["status"] = "draft"
 
-        # 复制图片文件（如果存在）
+        # 复制图片文件（如果存在）；copyfile只拷内容，
+        # 不像copy2那样额外stat/utime去保留元数据
         if self.current_image_path and Path(self.current_image_path).exists():
             file_extension = Path(self.current_image_path).suffix
-            new_image_path = Path("assets/images") / \
+            new_image_path = self._images_dir / \
                 f"{new_question_id}{file_extension}"
-            shutil.copy2(self.current_image_path, new_image_path)
+            shutil.copyfile(self.current_image_path, new_image_path)
             new_question_data["image_path"] = str(new_image_path)
 
         # 插入新题目
         self.insert_question(new_question_data)
 
-        # 刷新列表并加载新题目
-        self.refresh_question_list()
+        # 列表单条插入，加载新题目
+        self._insert_tree_row(new_question_data)
         self.load_question(new_question_id)
 
         messagebox.showinfo("成功", f"题目复制成功! 新题目ID: {new_question_id}")
@@ -1194,26 +1589,54 @@ class QuestionManagerGUI:
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 questions_data = json.load(f)
+
+            # 键集先整体校验一遍：坏行（缺列或无ID）提前剔除，
+            # 后面的热循环就能直接按键取值，不用逐字段防御
+            skipped = 0
+            valid_rows = []
+            for q_data in questions_data:
+                if REQUIRED_KEYS.issubset(q_data) and q_data['id']:
+                    valid_rows.append(q_data)
+                else:
+                    skipped += 1
+            questions_data = valid_rows
+
+            # 新增还是覆盖交给UPSERT在库内判定，不再分拣两批SQL；
+            # 这里只为统计弹窗查一遍已有ID（IN列表按500个一批，
+            # 避免超出SQLite参数上限）
+            ids = [q['id'] for q in questions_data]
+            existing = set()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                existing.update(row[0] for row in self.db.execute_query(
+                    f"SELECT id FROM questions WHERE id IN ({placeholders})",
+                    chunk))
+
+            # 单条UPSERT + executemany在一个事务里吃下整批：
+            # 一个预编译计划、一次遍历，逐行execute_update等于
+            # 每道题各提交一次事务
+            today = datetime.now().strftime("%Y-%m-%d")
+            rows = [_INSERT_COLS(q_data) + (today,) for q_data in questions_data]
+            with self.db.transaction() as conn:
+                conn.executemany(self._SQL_UPSERT_QUESTION, rows)
+
             imported_count = 0
             updated_count = 0
-            for q_data in questions_data:
-                q_id = q_data.get('id')
-                if not q_id:
-                    continue  # 跳过无ID的题目
-                # 检查是否已存在
-                existing = self.db.execute_query(
-                    "SELECT id FROM questions WHERE id = ?", (q_id,))
-                if existing:
-                    # 更新已有题目
-                    self.update_question(q_data)
+            for q_id in ids:
+                if q_id in existing:
                     updated_count += 1
                 else:
-                    # 插入新题目
-                    self.insert_question(q_data)
                     imported_count += 1
+                    # 同一文件里重复出现的ID按“先插入后覆盖”计数
+                    existing.add(q_id)
+            # 外部数据可能占用了任意序号，序号缓存整体作废
+            self._next_num.clear()
             self.refresh_question_list()
-            messagebox.showinfo(
-                "成功", f"导入完成：新增 {imported_count} 道，覆盖 {updated_count} 道题目。")
+            message = f"导入完成：新增 {imported_count} 道，覆盖 {updated_count} 道题目。"
+            if skipped:
+                message += f"\n跳过 {skipped} 条缺少必要字段的记录。"
+            messagebox.showinfo("成功", message)
         except Exception as e:
             messagebox.showerror("错误", f"导入题目失败: {e}")
 
@@ -1229,37 +1652,21 @@ class QuestionManagerGUI:
             return
 
         try:
-            # 获取所有题目
-            questions = self.db.execute_query("SELECT * FROM questions")
-
-            # 构建导出数据
-            export_data = []
-            for row in questions:
-                question_dict = {
-                    'id': row[0],
-                    'subject_code': row[1],
-                    'chapter_num': row[2],
-                    'question_type': row[3],
-                    'status': row[4],
-                    'question_text': row[5],
-                    'option_a': row[6],
-                    'option_b': row[7],
-                    'option_c': row[8],
-                    'option_d': row[9],
-                    'correct_answer': row[10],
-                    'explanation': row[11],
-                    'knowledge': row[12],
-                    'notes': row[13],
-                    'created_date': row[14],
-                    'last_modified': row[15],
-                    'image_path': row[16]
-                }
-                export_data.append(question_dict)
-
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, ensure_ascii=False, indent=2)
-
-            messagebox.showinfo("成功", f"成功导出 {len(export_data)} 道题目")
+            # 流式导出：边遍历游标边json.dump每一行，
+            # 不先在内存里堆一份全量dict列表再整体序列化。
+            # 列名在SELECT里写死，sqlite3.Row转dict即得导出格式
+            count = 0
+            with open(file_path, 'w', encoding='utf-8') as f, self.db.lock:
+                cur = self.db.conn.execute(self._SQL_EXPORT)
+                f.write('[')
+                for row in cur:
+                    if count:
+                        f.write(',\n')
+                    json.dump(dict(row), f, ensure_ascii=False)
+                    count += 1
+                f.write(']')
+
+            messagebox.showinfo("成功", f"成功导出 {count} 道题目")
 
         except Exception as e:
             messagebox.showerror("错误", f"导出题目失败: {e}")